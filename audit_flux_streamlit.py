@@ -1,12 +1,20 @@
 import streamlit as st
 import requests
-import xml.etree.ElementTree as ET
+import urllib3
+from lxml import etree as ET
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
 from io import BytesIO
+from typing import IO
 import re
 from decimal import Decimal, InvalidOperation
-from collections import defaultdict
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from operator import itemgetter
+from http.cookiejar import DefaultCookiePolicy
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
 
 """
 Audit d'un flux Google Merchant – version « mapping FR ➜ EN »
@@ -35,24 +43,37 @@ def add_custom_css():
     )
 
 # ---------------------------------------------------------------------------
-# 2)  Téléchargement / parsing XML
+# 2)  Téléchargement XML
 # ---------------------------------------------------------------------------
 
-def fetch_xml(url: str) -> bytes | None:
+@st.cache_resource
+def _http_session() -> requests.Session:
+    """Session partagée entre reruns et utilisateurs : connexions keep-alive réutilisées."""
+    session = requests.Session()
+    # aucun cookie conservé : la session est commune à tous les utilisateurs de l'app
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+def fetch_xml(url: str, validators: dict | None = None) -> requests.Response | None:
+    """GET conditionnel : renvoie la réponse (200 ou 304) ou None en cas d'erreur."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
     try:
-        r = requests.get(url, timeout=15)
+        r = _http_session().get(url, timeout=15, stream=True, headers=headers)
         r.raise_for_status()
-        return r.content
     except requests.exceptions.RequestException as exc:
+        # réponse d'erreur (4xx / 5xx) en streaming : fermée pour rendre la connexion au pool
+        if exc.response is not None:
+            exc.response.close()
         st.error(f"Erreur téléchargement : {exc}")
         return None
-
-def parse_xml(content: bytes) -> ET.Element | None:
-    try:
-        return ET.fromstring(content)
-    except ET.ParseError as exc:
-        st.error(f"Erreur de parsing XML : {exc}")
-        return None
+    # corps brut décompressé à la volée : lu au fil du parsing, jamais bufferisé en entier
+    r.raw.decode_content = True
+    return r
 
 # ---------------------------------------------------------------------------
 # 3)  Normalisations
@@ -64,20 +85,36 @@ _DIMENSION_RE = re.compile(r"^\d+(?:[.,]\d+)?\s?(?:mm|cm|in|kg|g)?$", re.I)
 def normalize_price(raw: str) -> str:
     if not raw or raw == "MISSING":
         return "MISSING"
-    m = _PRICE_RE.match(raw.strip())
+    raw = raw.strip()
+    # chemin rapide : forme Merchant usuelle « 12.90 EUR », sans re ni Decimal
+    amount, _, currency = raw.partition(" ")
+    units, dot, cents = amount.partition(".")
+    if (dot and len(cents) == 2 and amount.isascii() and units.isdigit() and cents.isdigit()
+            and (units[0] != "0" or len(units) == 1)
+            and len(currency) == 3 and currency.isascii() and currency.isalpha() and currency.isupper()):
+        return f"{amount.rstrip('0').rstrip('.')} {currency}"
+    m = _PRICE_RE.match(raw)
     if not m:
-        return raw.strip()
+        return raw
     amount, currency = m.groups()
     amount = amount.replace(",", ".")
-    try:
-        amount = f"{Decimal(amount):.2f}".rstrip("0").rstrip(".")
-    except InvalidOperation:
-        return raw.strip()
+    units, _, frac = amount.partition(".")
+    if amount.isascii() and len(frac) <= 2:
+        # au plus 2 décimales : pas d'arrondi, le formatage se fait sur la chaîne
+        amount = f"{units.lstrip('0') or '0'}.{frac:0<2}".rstrip("0").rstrip(".")
+    else:
+        # arrondi (au pair, comme Decimal) ou chiffres non ASCII
+        try:
+            amount = f"{Decimal(amount):.2f}".rstrip("0").rstrip(".")
+        except InvalidOperation:
+            return raw
     return f"{amount} {currency or 'EUR'}".strip()
 
 def normalize_gtin(raw: str) -> str:
     if not raw or raw == "MISSING":
         return "MISSING"
+    if raw.isascii() and raw.isdigit():
+        return f"{int(raw):013d}"
     try:
         val = int(Decimal(raw))
         return f"{val:013d}"
@@ -88,90 +125,90 @@ def normalize_gtin(raw: str) -> str:
 # 4)  Extraction produits
 # ---------------------------------------------------------------------------
 
-_NAMESPACE = {"g": "http://base.google.com/ns/1.0"}
-
-def analyze_products(root: ET.Element) -> list[dict]:
-    merchant_items = root.findall(".//item", _NAMESPACE)
-    if merchant_items:
-        return [_parse_google_item(it) for it in merchant_items]
-    fr_items = root.findall(".//Sheet1")
-    return [_parse_french_item(it) for it in fr_items]
+# Espace de noms Merchant en notation Clark : "{uri}tag", sans résolution de préfixe
+_G_NS = "{http://base.google.com/ns/1.0}"
+
+# options libxml2 : textes > 10 Mo acceptés, seules les entités internes du DTD
+# développées (entité externe = erreur de parsing, pas de XXE ; le plafond
+# d'amplification de libxml2 ≥ 2.11 reste actif avec huge_tree et refuse le
+# « billion laughs »), aucun accès réseau, commentaires / PI / nœuds d'indentation
+# non matérialisés (les blocs shipping / product_detail sont lus enfant par enfant),
+# pas d'index des attributs xml:id (jamais consultés, éléments libérés par item).
+_PARSER_OPTS = dict(
+    huge_tree=True,
+    resolve_entities="internal",
+    no_network=True,
+    remove_comments=True,
+    remove_pis=True,
+    remove_blank_text=True,
+    collect_ids=False,
+)
+
+def iter_products(source: IO[bytes]) -> Iterator[dict]:
+    """Parse le flux en streaming : chaque <item> / <Sheet1> est extrait puis libéré."""
+    for _, elem in ET.iterparse(source, events=("end",), tag=("item", "Sheet1"), **_PARSER_OPTS):
+        if elem.tag == "item":
+            yield _parse_google_item(elem)
+        else:
+            yield _parse_french_item(elem)
+        # mémoire constante : on vide l'élément et les frères déjà traités
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
 
 # ----------------------  4a) Merchant  ----------------------
 
-def _parse_google_item(item: ET.Element) -> dict:
-    g = lambda tag: (
-        (item.findtext(f"g:{tag}", namespaces=_NAMESPACE) or "").strip()
-        or "MISSING"
-    )
-    g_or_plain = lambda tag: (
-        (
-            item.findtext(f"g:{tag}", namespaces=_NAMESPACE)
-            or item.findtext(tag)
-            or ""
-        ).strip()
-        or "MISSING"
-    )
-
-    # Shipping (bloc)
-    shipping_elem = item.find("g:shipping", _NAMESPACE)
-    shipping_block = "".join(shipping_elem.itertext()).strip() if shipping_elem is not None else "MISSING"
+# Attributs lus en g:xxx avec repli sur la balise sans préfixe
+_G_OR_PLAIN = ("title", "description", "link", "google_product_category")
+
+# Sous-champs de g:shipping, dans l'ordre positionnel de la forme à plat du spec
+# Merchant (country:region:service:price) ; les autres sous-balises sont ignorées
+_SHIPPING_TAGS = tuple(_G_NS + tag for tag in ("country", "region", "service", "price"))
+
+def _parse_google_item(item: ET._Element) -> dict:
+    # Un seul passage sur les enfants (au lieu d'un find() par attribut) :
+    # tag -> texte de la première occurrence, comme findtext.
+    shipping_tag, detail_tag = _CLARK["shipping"], _CLARK["product_detail"]
+    texts: dict = {}
+    shipping_elem = None
+    product_detail_elems = []
+    for child in item:
+        tag = child.tag
+        if tag == detail_tag:
+            product_detail_elems.append(child)
+        elif tag == shipping_tag and shipping_elem is None:
+            shipping_elem = child
+        texts.setdefault(tag, child.text or "")
+
+    # Attributs simples : une compréhension sur la table pré-résolue
+    prod = {attr: texts.get(tag, "").strip() or "MISSING" for attr, tag in _CLARK.items()}
+    for attr in _G_OR_PLAIN:
+        prod[attr] = (texts.get(_CLARK[attr]) or texts.get(attr) or "").strip() or "MISSING"
+    prod["price"] = normalize_price(prod["price"])
+    prod["sale_price"] = normalize_price(prod["sale_price"])
+    prod["gtin"] = normalize_gtin(prod["gtin"])
+
+    # Shipping (bloc) : sous-champs connus remis dans la forme à plat du spec,
+    # positions vides conservées (<country>FR</country><price>…</price> -> FR:::…) ;
+    # un g:shipping déjà à plat (sans enfant) est repris tel quel
+    if shipping_elem is not None and len(shipping_elem):
+        sub: dict = {}
+        for child in shipping_elem:
+            sub.setdefault(child.tag, (child.text or "").strip())
+        prod["shipping"] = ":".join(sub.get(tag, "") for tag in _SHIPPING_TAGS)
+    elif shipping_elem is not None:
+        prod["shipping"] = (shipping_elem.text or "").strip()
+    else:
+        prod["shipping"] = "MISSING"
 
     # product_detail peut être multiple – on concatène proprement
-    product_detail_elems = item.findall("g:product_detail", _NAMESPACE)
     if product_detail_elems:
-        product_detail_txt = " | ".join((" ".join(pd.itertext()).strip() for pd in product_detail_elems)).strip() or "MISSING"
+        details = (" ".join(filter(None, map(str.strip, pd.itertext()))) for pd in product_detail_elems)
+        prod["product_detail"] = " | ".join(details).strip() or "MISSING"
     else:
-        product_detail_txt = g("product_detail")
-
-    return {
-        "id": g("id"),
-        "title": g_or_plain("title"),
-        "description": g_or_plain("description"),
-        "link": g_or_plain("link"),
-        "image_link": g("image_link"),
-        "price": normalize_price(g("price")),
-        "sale_price": normalize_price(g("sale_price")),
-        "availability": g("availability"),
-        "condition": g("condition"),
-        "brand": g("brand"),
-        "gtin": normalize_gtin(g("gtin")),
-        "mpn": g("mpn"),
-        "color": g("color"),
-        "size": g("size"),
-        "age_group": g("age_group"),
-        "gender": g("gender"),
-        "item_group_id": g("item_group_id"),
-        # certification & dimensions
-        "certification_authority": g("certification_authority"),
-        "certification_name": g("certification_name"),
-        "certification_code": g("certification_code"),
-        "product_length": g("product_length"),
-        "product_width": g("product_width"),
-        "product_height": g("product_height"),
-        "product_weight": g("product_weight"),
-        "shipping_length": g("shipping_length"),
-        "shipping_width": g("shipping_width"),
-        "shipping_height": g("shipping_height"),
-        # divers
-        "shipping": shipping_block,
-        "shipping_weight": g("shipping_weight"),
-        "pattern": g("pattern"),
-        "material": g("material"),
-        "additional_image_link": g("additional_image_link"),
-        "size_type": g("size_type"),
-        "size_system": g("size_system"),
-        "canonical_link": g("canonical_link"),
-        "expiration_date": g("expiration_date"),
-        "sale_price_effective_date": g("sale_price_effective_date"),
-        "product_highlight": g("product_highlight"),
-        "ships_from_country": g("ships_from_country"),
-        "minimum_handling_time": g("minimum_handling_time"),
-        "max_handling_time": g("max_handling_time"),
-        "availability_date": g("availability_date"),
-        "product_detail": product_detail_txt,
-        "google_product_category": g_or_plain("google_product_category"),
-    }
+        prod["product_detail"] = "MISSING"
+
+    return prod
 
 # ----------------------  4b) Flux interne FR  ----------------------
 
@@ -213,32 +250,40 @@ FR_TO_EN_MAPPING = {
     "delai_traitement_maximum": "max_handling_time",
 }
 
-def _parse_french_item(item: ET.Element) -> dict:
+# balises déjà conformes (gtin etc.)
+_FR_DIRECT_TAGS = (
+    "gtin", "description", "shipping", "item_group_id", "mpn",
+    "pattern", "material", "additional_image_link", "size_type",
+    "size_system", "canonical_link", "expiration_date",
+    "sale_price_effective_date", "product_highlight",
+    "ships_from_country", "minimum_handling_time", "max_handling_time",
+    "availability_date", "product_detail",
+    "google_product_category",
+)
+
+def _parse_french_item(item: ET._Element) -> dict:
     data: dict = {}
 
+    # Un seul passage sur les enfants (au lieu d'un findtext() par balise) :
+    # tag -> texte de la première occurrence, comme findtext.
+    texts: dict = {}
+    for child in item:
+        texts.setdefault(child.tag, child.text)
+
     # 1) mapping direct FR -> EN
     for fr_tag, en_key in FR_TO_EN_MAPPING.items():
-        raw = (item.findtext(fr_tag) or "").strip()
+        raw = (texts.get(fr_tag) or "").strip()
         if raw:
             data[en_key] = raw
 
-    # 2) balises déjà conformes (gtin etc.)
-    direct_tags = [
-        "gtin", "description", "shipping", "item_group_id", "mpn",
-        "pattern", "material", "additional_image_link", "size_type",
-        "size_system", "canonical_link", "expiration_date",
-        "sale_price_effective_date", "product_highlight",
-        "ships_from_country", "minimum_handling_time", "max_handling_time",
-        "availability_date", "product_detail",
-        "google_product_category",
-    ]
-    for tag in direct_tags:
-        txt = (item.findtext(tag) or "").strip()
+    # 2) balises déjà conformes
+    for tag in _FR_DIRECT_TAGS:
+        txt = (texts.get(tag) or "").strip()
         if txt:
             data[tag] = txt
 
     # 3) certification concaténée (fallback rare)
-    concat_val = (item.findtext("certificationcertificationauthoritycertificationcodecertificationname") or "").strip()
+    concat_val = (texts.get("certificationcertificationauthoritycertificationcodecertificationname") or "").strip()
     if concat_val:
         parts = concat_val.split(":")
         if len(parts) == 3:
@@ -263,54 +308,73 @@ def _parse_french_item(item: ET.Element) -> dict:
 
 _PRICE_VALID_RE = re.compile(r"^\d+(?:\.\d{1,2})?\s?[A-Z]{3}$")
 
-def validate_products(products: list[dict]) -> list[dict]:
-    seen_ids: set[str] = set()
-    validated: list[dict] = []
+# valeurs considérées comme absentes
+_MISSING = frozenset(("", "MISSING"))
 
-    for prod in products:
+# groupes d'attributs contrôlés ensemble
+_CERTIFICATION_ATTRS = ("certification_authority", "certification_name", "certification_code")
+_DIMENSION_ATTRS = (
+    "product_length", "product_width", "product_height", "product_weight",
+    "shipping_length", "shipping_width", "shipping_height",
+)
+# valeurs d'un groupe en un appel C, testées d'un bloc contre _MISSING (isdisjoint)
+_CERTIFICATION_VALUES = itemgetter(*_CERTIFICATION_ATTRS)
+_DIMENSION_VALUES = itemgetter(*_DIMENSION_ATTRS)
+
+def _is_zero_price(price: str) -> bool:
+    """Montant nul (« 0 EUR », « 0.00 », « 0,0 EUR ») ; faux si le montant ne se lit pas."""
+    if price[:1] not in "0.,+-":
+        # un montant nul commence forcément par l'un de ces caractères : pas de float()
+        return False
+    try:
+        return float(price.partition(" ")[0].replace(",", ".")) == 0
+    except ValueError:
+        return False
+
+def validate_products(products: Iterable[dict]) -> list[dict]:
+    validated: list[dict] = list(products)
+    # décompte des id en une passe : toutes les occurrences d'un doublon sont signalées
+    id_counts = Counter(prod["id"] for prod in validated)
+    # méthodes liées une fois pour toutes, hors de la boucle
+    price_ok = _PRICE_VALID_RE.match
+    dim_ok = _DIMENSION_RE.match
+    none_missing = _MISSING.isdisjoint
+
+    for prod in validated:
         pid = prod["id"]
         price = prod["price"]
         desc  = prod["description"]
+        if price == "MISSING":
+            price_invalid, price_null = True, False
+        else:
+            price_invalid, price_null = not price_ok(price), _is_zero_price(price)
 
-        def missing(attr: str) -> bool:
-            return prod.get(attr) in ("", "MISSING")
-
-        dims_invalid = any(
-            not _DIMENSION_RE.match(prod[attr]) for attr in (
-                "product_length", "product_width", "product_height",
-                "shipping_length", "shipping_width", "shipping_height",
-                "product_weight",
-            ) if not missing(attr)
-        )
+        dims = _DIMENSION_VALUES(prod)
+        dims_invalid = any(not dim_ok(v) for v in dims if v not in _MISSING)
 
         errors = {
-            "duplicate_id":                 "Erreur" if pid in seen_ids else "OK",
-            "invalid_or_missing_price":     "Erreur" if price == "MISSING" or not _PRICE_VALID_RE.match(price) else "OK",
-            "null_price":                   "Erreur" if price.startswith("0") else "OK",
+            "duplicate_id":                 "Erreur" if id_counts[pid] > 1 else "OK",
+            "invalid_or_missing_price":     "Erreur" if price_invalid else "OK",
+            "null_price":                   "Erreur" if price_null else "OK",
             "missing_title":                "Erreur" if prod["title"] == "MISSING" else "OK",
             "description_missing_or_short": "Erreur" if len(desc) < 20 else "OK",
             "invalid_availability":         "Erreur" if prod["availability"] == "MISSING" else "OK",
-            "missing_or_empty_color":       "Erreur" if missing("color") else "OK",
-            "missing_or_empty_gender":      "Erreur" if missing("gender") else "OK",
-            "missing_or_empty_size":        "Erreur" if missing("size") else "OK",
-            "missing_or_empty_age_group":   "Erreur" if missing("age_group") else "OK",
-            "missing_or_empty_image_link":  "Erreur" if missing("image_link") else "OK",
+            "missing_or_empty_color":       "Erreur" if prod["color"] in _MISSING else "OK",
+            "missing_or_empty_gender":      "Erreur" if prod["gender"] in _MISSING else "OK",
+            "missing_or_empty_size":        "Erreur" if prod["size"] in _MISSING else "OK",
+            "missing_or_empty_age_group":   "Erreur" if prod["age_group"] in _MISSING else "OK",
+            "missing_or_empty_image_link":  "Erreur" if prod["image_link"] in _MISSING else "OK",
             # certification / dimensions
-            "missing_certification":        "Erreur" if any(missing(a) for a in (
-                                                "certification_authority", "certification_name", "certification_code"
-                                              )) else "OK",
-            "missing_dimensions_weight":    "Erreur" if any(missing(a) for a in (
-                                                "product_length", "product_width", "product_height", "product_weight",
-                                                "shipping_length", "shipping_width", "shipping_height"
-                                              )) else "OK",
+            "missing_certification":        "OK" if none_missing(_CERTIFICATION_VALUES(prod)) else "Erreur",
+            "missing_dimensions_weight":    "OK" if none_missing(dims) else "Erreur",
             "invalid_dimension_format":     "Erreur" if dims_invalid else "OK",
             # ✅ Nouveaux contrôles demandés
-            "missing_google_product_category": "Erreur" if missing("google_product_category") else "OK",
-            "missing_minimum_handling_time":   "Erreur" if missing("minimum_handling_time") else "OK",
+            "missing_google_product_category": "Erreur" if prod["google_product_category"] in _MISSING else "OK",
+            "missing_minimum_handling_time":   "Erreur" if prod["minimum_handling_time"] in _MISSING else "OK",
         }
 
-        validated.append({**prod, **errors})
-        seen_ids.add(pid)
+        # mise à jour en place : pas de copie {**prod, **errors} par produit
+        prod.update(errors)
 
     return validated
 
@@ -336,6 +400,9 @@ _PRODUCT_ATTRS = [
     "availability_date", "product_detail",
 ]
 
+# Tags Merchant pré-résolus (cf. _parse_google_item)
+_CLARK = {attr: _G_NS + attr for attr in _PRODUCT_ATTRS}
+
 # Colonnes de validation
 _VALIDATION_ATTRS = [
     "duplicate_id", "invalid_or_missing_price", "null_price", "missing_title",
@@ -349,6 +416,9 @@ _VALIDATION_ATTRS = [
 
 _HEADERS = _PRODUCT_ATTRS + _VALIDATION_ATTRS
 
+# extraction d'une ligne Validation en un seul appel C (toutes les clés sont garanties)
+_ROW = itemgetter(*_HEADERS)
+
 # Table des statuts (ta liste)
 FIELD_STATUS = {
     "id": "Mandatory",
@@ -397,30 +467,89 @@ FIELD_STATUS = {
     "google_product_category": "Mandatory",
 }
 
+# attributs exportés groupés par statut : table figée, calculée une fois à l'import
+_ATTRS_BY_STATUS = {
+    status: [a for a, s in FIELD_STATUS.items() if s == status and a in _PRODUCT_ATTRS]
+    for status in FIELD_STATUS.values()
+}
+
+_BOLD = Font(bold=True)
+
+def _header_row(ws, labels: list[str]) -> list[WriteOnlyCell]:
+    """Ligne d'en-tête en gras (mode write-only : style posé avant l'écriture)."""
+    cells = []
+    for label in labels:
+        cell = WriteOnlyCell(ws, value=label)
+        cell.font = _BOLD
+        cells.append(cell)
+    return cells
+
+# Lignes de la feuille Validation écrites directement en XML, dans la forme
+# qu'emploie openpyxl (cellules inlineStr) : sa sérialisation cellule par cellule
+# représentait ~90 % du temps d'export. openpyxl garde en-têtes, styles et récaps.
+_COLUMNS = [get_column_letter(i) for i in range(1, len(_HEADERS) + 1)]
+
+def _row_xml(r: int, row: tuple) -> str:
+    parts = [f'<row r="{r}">']
+    for col, value in zip(_COLUMNS, row):
+        if not value:
+            parts.append(f'<c r="{col}{r}" t="inlineStr"/>')
+            continue
+        value = value[:32767]  # limite Excel, comme openpyxl
+        space = ' xml:space="preserve"' if value != value.strip() else ""
+        text = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\r", "&#13;")
+        parts.append(f'<c r="{col}{r}" t="inlineStr"><is><t{space}>{text}</t></is></c>')
+    parts.append("</row>")
+    return "".join(parts)
+
+def _with_validation_rows(src: BytesIO, sheet_part: str, data: list[dict]) -> BytesIO:
+    """Recopie le classeur en insérant les lignes produits dans la partie ``sheet_part``."""
+    out = BytesIO()
+    with ZipFile(src) as zin, ZipFile(out, "w", ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            content = zin.read(info)
+            if info.filename != sheet_part:
+                zout.writestr(info, content)
+                continue
+            cut = content.rfind(b"</sheetData>")
+            if cut < 0 or content.count(b"</sheetData>") != 1:
+                raise RuntimeError(f"{sheet_part} : </sheetData> introuvable ou multiple")
+            head, tail = content[:cut], content[cut:]
+            part = ZipInfo(info.filename, info.date_time)
+            part.compress_type = ZIP_DEFLATED
+            # taille finale inconnue à l'ouverture (longues descriptions…) : Zip64 toujours
+            with zout.open(part, "w", force_zip64=True) as sheet:
+                sheet.write(head)
+                for r, prod in enumerate(data, start=2):
+                    sheet.write(_row_xml(r, _ROW(prod)).encode())
+                sheet.write(tail)
+    out.seek(0)
+    return out
+
 def generate_excel(data: list[dict]) -> BytesIO:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Validation"
-
-    # Feuille 1 : données + flags
-    ws.append(_HEADERS)
-    for c in ws[1]:
-        c.font = Font(bold=True)
+    # write-only : les lignes partent au fil de l'eau, sans graphe de cellules en mémoire
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Validation")
+
+    # Feuille 1 : données + flags (en-tête ici, lignes insérées par _with_validation_rows)
+    ws.append(_header_row(ws, _HEADERS))
+
+    # une seule passe sur les produits pour compter les manquants de chaque attribut
+    missing_counts = dict.fromkeys(_PRODUCT_ATTRS, 0)
     for prod in data:
-        ws.append([prod.get(col, "") for col in _HEADERS])
+        for attr in _PRODUCT_ATTRS:
+            if prod[attr] in _MISSING:
+                missing_counts[attr] += 1
 
     # Feuille 2 : récap par attribut
     recap = wb.create_sheet("Recap_Attributs")
-    recap.append(["Attribut", "Statut", "Présents", "Manquants", "% manquant"])
-    for c in recap[1]:
-        c.font = Font(bold=True)
+    recap.append(_header_row(recap, ["Attribut", "Statut", "Présents", "Manquants", "% manquant"]))
 
     total = len(data) or 1
     # pour synthèse par statut
     by_status_counts = defaultdict(list)  # status -> [missing_rate_of_attr1, attr2, ...]
 
-    for attr in _PRODUCT_ATTRS:
-        missing = sum(1 for p in data if p.get(attr) in ("", "MISSING"))
+    for attr, missing in missing_counts.items():
         status = FIELD_STATUS.get(attr, "")
         missing_pct = (missing / total) * 100
         recap.append([attr, status, total - missing, missing, f"{missing_pct:.1f}"])
@@ -429,20 +558,16 @@ def generate_excel(data: list[dict]) -> BytesIO:
 
     # Feuille 3 : synthèse par statut
     synth = wb.create_sheet("Synthese_par_statut")
-    synth.append(["Statut", "Nb attributs", "Taux de complétion moyen (%)", "Attributs"])
-    for c in synth[1]:
-        c.font = Font(bold=True)
+    synth.append(_header_row(synth, ["Statut", "Nb attributs", "Taux de complétion moyen (%)", "Attributs"]))
 
     for status, completion_list in by_status_counts.items():
-        attrs = [a for a, s in FIELD_STATUS.items() if s == status and a in _PRODUCT_ATTRS]
+        attrs = _ATTRS_BY_STATUS[status]
         avg_completion = sum(completion_list) / len(completion_list) if completion_list else 0.0
         synth.append([status, len(attrs), f"{avg_completion:.1f}", ", ".join(attrs)])
 
     # Feuille 4 : règles (tableau brut des statuts fournis)
     rules = wb.create_sheet("Regles_Attributs")
-    rules.append(["Field Name", "Status"])
-    for c in rules[1]:
-        c.font = Font(bold=True)
+    rules.append(_header_row(rules, ["Field Name", "Status"]))
     # on réinscrit la table pour transparence
     for field, status in FIELD_STATUS.items():
         rules.append([field, status])
@@ -450,10 +575,50 @@ def generate_excel(data: list[dict]) -> BytesIO:
     buf = BytesIO()
     wb.save(buf)
     buf.seek(0)
-    return buf
+    # chemin de partie attribué par openpyxl à l'enregistrement (dépend de l'ordre des feuilles)
+    return _with_validation_rows(buf, ws.path.lstrip("/"), data)
+
+# ---------------------------------------------------------------------------
+# 7)  Pipeline d'audit
+# ---------------------------------------------------------------------------
+
+def audit(source: IO[bytes]) -> tuple[int, bytes]:
+    """Parse, valide et exporte un flux : (nb produits, rapport Excel)."""
+    validated = validate_products(iter_products(source))
+    return len(validated), generate_excel(validated).getvalue()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def audit_content(content: bytes) -> tuple[int, bytes]:
+    """Audit mémoïsé sur le contenu, en mémoire seulement (4 derniers flux, rien sur disque)."""
+    return audit(BytesIO(content))
+
+def audit_url(url: str) -> tuple[int, bytes] | None:
+    """Audit d'un flux distant ; un 304 réutilise le dernier rapport de la session."""
+    cache = st.session_state.setdefault("feed_cache", {})
+    cached = cache.get(url)
+    r = fetch_xml(url, cached)
+    if r is None:
+        return None
+    # réponse en streaming : fermée sur toutes les voies (304, ParseError, coupure)
+    # pour rendre la connexion au pool de la session partagée
+    with r:
+        if r.status_code == 304 and cached:
+            return cached["result"]
+        try:
+            result = audit(r.raw)
+        except urllib3.exceptions.HTTPError as exc:
+            # le corps est lu pendant le parsing : une coupure réseau remonte ici
+            st.error(f"Erreur téléchargement : {exc}")
+            return None
+    cache[url] = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "result": result,
+    }
+    return result
 
 # ---------------------------------------------------------------------------
-# 7)  Interface Streamlit
+# 8)  Interface Streamlit
 # ---------------------------------------------------------------------------
 
 def main():
@@ -464,25 +629,20 @@ def main():
     uploaded_file = st.file_uploader("… ou téléchargez un fichier XML :", type=["xml"])
 
     if st.button("Auditer le flux"):
-        content = None
-        if url:
-            content = fetch_xml(url)
-        elif uploaded_file is not None:
-            content = uploaded_file.read()
-
-        if not content:
+        if not url and uploaded_file is None:
             st.warning("Veuillez fournir une URL ou un fichier XML.")
             st.stop()
 
-        root = parse_xml(content)
-        if not root:
+        try:
+            result = audit_url(url) if url else audit_content(uploaded_file.getvalue())
+        except ET.ParseError as exc:
+            st.error(f"Erreur de parsing XML : {exc}")
             st.stop()
+        if result is None:
+            st.stop()
+        nb_products, xlsx = result
 
-        products = analyze_products(root)
-        validated = validate_products(products)
-        xlsx = generate_excel(validated)
-
-        st.success(f"Audit terminé : {len(products)} produit(s) analysé(s).")
+        st.success(f"Audit terminé : {nb_products} produit(s) analysé(s).")
         st.download_button(
             "Télécharger le rapport Excel",
             data=xlsx,
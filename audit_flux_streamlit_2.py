@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 import json
-import re
 from io import BytesIO
+from itertools import islice
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
@@ -60,12 +61,13 @@ def extract_variant_names(json_str):
     except Exception:
         return ""
 
-def clean_description(text):
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r"\* ", "", text)
-    text = re.sub(r"\n+", " / ", text)
-    return text.strip(" /")
+def clean_descriptions(col):
+    # opérations vectorisées sur toute la colonne (df déjà en str, NaN -> "")
+    return (
+        col.str.replace("* ", "", regex=False)
+           .str.replace(r"\n+", " / ", regex=True)
+           .str.strip(" /")
+    )
 
 # ── Sidebar ──
 with st.sidebar:
@@ -107,9 +109,9 @@ if uploaded:
     with st.spinner("Transformation des colonnes..."):
 
         if opt_desc and "description" in df.columns:
-            df["description"] = df["description"].apply(clean_description)
+            df["description"] = clean_descriptions(df["description"])
         if opt_desc and "es_body_html" in df.columns:
-            df["es_body_html"] = df["es_body_html"].apply(clean_description)
+            df["es_body_html"] = clean_descriptions(df["es_body_html"])
 
         if opt_pub and "publications" in df.columns:
             df["publications_names"] = df["publications"].apply(extract_publications)
@@ -220,59 +222,73 @@ if uploaded:
         }
 
         MAX_ROWS = 1_048_575
-        wb = Workbook()
-        if "Sheet" in wb.sheetnames: del wb["Sheet"]
+        # write-only : chaque ligne part dans le XML de la feuille, rien n'est gardé en mémoire
+        wb = Workbook(write_only=True)
 
-        sheet_idx   = 1
-        batch       = []
-        sheets_made = 0
+        def styled_cell(ws, value=None, **style):
+            cell = WriteOnlyCell(ws, value=value)
+            for attr, val in style.items():
+                setattr(cell, attr, val)
+            return cell
 
-        def flush(rows, name):
+        def write_sheet(rows, name):
             ws = wb.create_sheet(title=name)
+            # en write-only, largeurs / hauteur / volets se posent avant la 1re ligne
             for ci, col in enumerate(final_cols, 1):
-                cell = ws.cell(row=1, column=ci, value=col)
-                cell.font      = Font(name="Arial", bold=True, color="FFFFFF", size=10)
-                cell.fill      = PatternFill("solid", fgColor=col_hdr_color(col))
-                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-                cell.border    = border
+                w = COL_WIDTHS.get(col, 22 if col.startswith("meta.") else 35 if col.startswith("es_") else 18)
+                ws.column_dimensions[get_column_letter(ci)].width = min(w, 80)
             ws.row_dimensions[1].height = 32
             ws.freeze_panes = "A2"
 
-            data_font = Font(name="Arial", size=10)
+            ws.append([
+                styled_cell(
+                    ws, col,
+                    font=Font(name="Arial", bold=True, color="FFFFFF", size=10),
+                    fill=PatternFill("solid", fgColor=col_hdr_color(col)),
+                    alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+                    border=border,
+                )
+                for col in final_cols
+            ])
+
+            # cellules modèles stylées une fois, (pair, impair) par colonne : seule la valeur
+            # change d'une ligne à l'autre (le writer sérialise chaque cellule dès l'append)
+            data_font  = Font(name="Arial", size=10)
+            data_align = Alignment(vertical="center")
+            templates  = [
+                tuple(
+                    styled_cell(ws, font=data_font, fill=PatternFill("solid", fgColor=col_row_fill(col, parity)),
+                                border=border, alignment=data_align)
+                    for parity in (0, 1)
+                )
+                for col in final_cols
+            ]
             for ri, row in enumerate(rows, 2):
-                for ci, (col, val) in enumerate(zip(final_cols, row), 1):
-                    cell = ws.cell(row=ri, column=ci, value=val)
-                    cell.font      = data_font
-                    cell.fill      = PatternFill("solid", fgColor=col_row_fill(col, ri))
-                    cell.border    = border
-                    cell.alignment = Alignment(vertical="center")
-
-            for ci, col in enumerate(final_cols, 1):
-                w = COL_WIDTHS.get(col, 22 if col.startswith("meta.") else 35 if col.startswith("es_") else 18)
-                ws.column_dimensions[get_column_letter(ci)].width = min(w, 80)
-
-        for _, row_data in df_out.iterrows():
-            batch.append(list(row_data))
-            if len(batch) >= MAX_ROWS:
-                name = f"Data_{sheet_idx}"
-                flush(batch, name)
-                sheet_idx += 1
-                sheets_made += 1
-                batch = []
-
-        if batch:
-            flush(batch, "Data" if sheet_idx == 1 else f"Data_{sheet_idx}")
+                parity = ri % 2
+                cells = [tpl[parity] for tpl in templates]
+                for cell, val in zip(cells, row):
+                    cell.value = val
+                ws.append(cells)
+
+        # lignes lues au fil de l'eau (itertuples, pas de Series par ligne), découpées par feuille
+        rows_iter = df_out.itertuples(index=False, name=None)
+        for sheet_idx, start in enumerate(range(0, len(df_out), MAX_ROWS), 1):
+            n = min(MAX_ROWS, len(df_out) - start)
+            name = "Data" if sheet_idx == 1 and n < MAX_ROWS else f"Data_{sheet_idx}"
+            write_sheet(islice(rows_iter, n), name)
 
         # Feuille légende
         ws_l = wb.create_sheet("Légende")
         legend = [("Attributs Merchant Center", HDR_BLUE), ("Metafields (meta.*)", HDR_BROWN), ("Espagnol (es_*)", HDR_GREEN)]
-        ws_l["A1"] = "Couleur"; ws_l["B1"] = "Type"
-        for c in ws_l["1:1"]: c.font = Font(name="Arial", bold=True)
-        for ri, (label, clr) in enumerate(legend, 2):
-            ws_l.cell(row=ri, column=1).fill = PatternFill("solid", fgColor=clr)
-            ws_l.cell(row=ri, column=2, value=label).font = Font(name="Arial", size=10)
         ws_l.column_dimensions["A"].width = 5
         ws_l.column_dimensions["B"].width = 35
+        hdr_font = Font(name="Arial", bold=True)
+        ws_l.append([styled_cell(ws_l, "Couleur", font=hdr_font), styled_cell(ws_l, "Type", font=hdr_font)])
+        for label, clr in legend:
+            ws_l.append([
+                styled_cell(ws_l, fill=PatternFill("solid", fgColor=clr)),
+                styled_cell(ws_l, label, font=Font(name="Arial", size=10)),
+            ])
 
         output = BytesIO()
         wb.save(output)
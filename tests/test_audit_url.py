@@ -0,0 +1,84 @@
+"""Régression : coupure réseau pendant la lecture en streaming d'un flux distant."""
+import io
+import unittest
+from unittest import mock
+
+import requests
+import urllib3
+
+import audit_flux_streamlit as afs
+
+_FEED = (
+    b'<?xml version="1.0"?>'
+    b'<rss xmlns:g="http://base.google.com/ns/1.0"><channel>'
+    + b"<item><g:id>1</g:id><title>Produit</title></item>" * 50
+)
+
+class _BrokenRaw(io.RawIOBase):
+    """Corps HTTP qui livre ``payload`` puis échoue comme urllib3 sur une coupure."""
+
+    def __init__(self, payload: bytes):
+        self._payload = io.BytesIO(payload)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = self._payload.readinto(buf)
+        if not n:
+            raise urllib3.exceptions.ProtocolError("Connection broken: IncompleteRead")
+        return n
+
+def _streamed_response(raw) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.raw = raw
+    return r
+
+class AuditUrlMidStreamFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.session_state = {}
+        patches = [
+            mock.patch.object(afs.st, "session_state", self.session_state),
+            mock.patch.object(afs.st, "error"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_broken_stream_reports_error_and_closes_response(self):
+        raw = _BrokenRaw(_FEED)
+        with mock.patch.object(afs, "fetch_xml", return_value=_streamed_response(raw)):
+            result = afs.audit_url("https://example.test/feed.xml")
+
+        self.assertIsNone(result)
+        afs.st.error.assert_called_once()
+        self.assertIn("Erreur téléchargement", afs.st.error.call_args.args[0])
+        # aucun rapport partiel mis en cache, connexion rendue au pool
+        self.assertNotIn("https://example.test/feed.xml", self.session_state.get("feed_cache", {}))
+        self.assertTrue(raw.closed)
+
+    def test_broken_stream_keeps_previous_report(self):
+        url = "https://example.test/feed.xml"
+        previous = {"etag": '"v1"', "last_modified": None, "result": (1, b"xlsx")}
+        self.session_state["feed_cache"] = {url: previous}
+        with mock.patch.object(afs, "fetch_xml", return_value=_streamed_response(_BrokenRaw(_FEED))):
+            self.assertIsNone(afs.audit_url(url))
+        self.assertIs(self.session_state["feed_cache"][url], previous)
+
+class FetchXmlHttpErrorTest(unittest.TestCase):
+    def test_error_status_closes_response(self):
+        raw = io.BytesIO(b"<html>Internal Server Error</html>")
+        r = _streamed_response(raw)
+        r.status_code = 500
+        r.url = "https://example.test/feed.xml"
+        session = mock.Mock(get=mock.Mock(return_value=r))
+        with mock.patch.object(afs, "_http_session", return_value=session), \
+                mock.patch.object(afs.st, "error") as error:
+            self.assertIsNone(afs.fetch_xml("https://example.test/feed.xml"))
+        error.assert_called_once()
+        # connexion rendue au pool malgré l'erreur HTTP
+        self.assertTrue(raw.closed)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Export : la feuille Validation écrite en XML brut relit comme une écriture openpyxl."""
+import unittest
+from io import BytesIO
+
+from openpyxl import Workbook, load_workbook
+
+import audit_flux_streamlit as afs
+
+_LONG = "x" * 40_000  # au-delà de la limite Excel de 32 767 caractères par cellule
+
+_VALUES = {
+    "id": "a & b <c> d",
+    "title": "ligne 1\r\nligne 2",
+    "description": "  valeur entourée d'espaces  ",
+    "color": "",
+    "brand": _LONG,
+    "link": "é’ — ünïcödé",
+}
+
+def _products() -> list[dict]:
+    base = {attr: "MISSING" for attr in afs._PRODUCT_ATTRS}
+    return afs.validate_products([base | _VALUES, base | {"id": "2", "title": "Produit"}])
+
+def _reference_rows(data: list[dict]) -> list[tuple]:
+    """Mêmes lignes écrites cellule par cellule par openpyxl, relues telles quelles."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Validation")
+    ws.append(afs._HEADERS)
+    for prod in data:
+        ws.append(afs._ROW(prod))
+    buf = BytesIO()
+    wb.save(buf)
+    return list(load_workbook(buf)["Validation"].iter_rows(values_only=True))
+
+class GenerateExcelRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.data = _products()
+        self.wb = load_workbook(afs.generate_excel(self.data))
+
+    def test_sheet_order(self):
+        self.assertEqual(
+            self.wb.sheetnames,
+            ["Validation", "Recap_Attributs", "Synthese_par_statut", "Regles_Attributs"],
+        )
+
+    def test_validation_rows_match_openpyxl(self):
+        rows = list(self.wb["Validation"].iter_rows(values_only=True))
+        self.assertEqual(rows, _reference_rows(self.data))
+
+    def test_escaped_and_truncated_values(self):
+        row = dict(zip(afs._HEADERS, next(self.wb["Validation"].iter_rows(min_row=2, values_only=True))))
+        self.assertEqual(row["id"], "a & b <c> d")
+        self.assertEqual(row["title"], "ligne 1\r\nligne 2")
+        self.assertEqual(row["description"], "  valeur entourée d'espaces  ")
+        self.assertIsNone(row["color"])
+        self.assertEqual(row["brand"], _LONG[:32767])
+        self.assertEqual(row["link"], "é’ — ünïcödé")
+
+class WithValidationRowsTest(unittest.TestCase):
+    def test_part_without_sheet_data_raises(self):
+        # une partie sans </sheetData> (ici le workbook) ne doit pas être épissée à l'aveugle
+        wb = Workbook(write_only=True)
+        wb.create_sheet("Validation")
+        buf = BytesIO()
+        wb.save(buf)
+        buf.seek(0)
+        with self.assertRaises(RuntimeError):
+            afs._with_validation_rows(buf, "xl/workbook.xml", [])
+
+if __name__ == "__main__":
+    unittest.main()
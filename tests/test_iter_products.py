@@ -0,0 +1,65 @@
+"""Extraction des produits : options du parseur et lecture des blocs."""
+import unittest
+from io import BytesIO
+
+from lxml import etree
+
+import audit_flux_streamlit as afs
+
+def _items(body: bytes, doctype: bytes = b"") -> list[dict]:
+    feed = (
+        b'<?xml version="1.0"?>' + doctype
+        + b'<rss xmlns:g="http://base.google.com/ns/1.0"><channel>'
+        + body + b"</channel></rss>"
+    )
+    return list(afs.iter_products(BytesIO(feed)))
+
+class EntityTest(unittest.TestCase):
+    def test_internal_entities_are_expanded(self):
+        (prod,) = _items(
+            b"<item><g:title>Shoe by &brand; - red</g:title><g:brand>&brand;</g:brand></item>",
+            b'<!DOCTYPE rss [<!ENTITY brand "ACME">]>',
+        )
+        self.assertEqual(prod["title"], "Shoe by ACME - red")
+        self.assertEqual(prod["brand"], "ACME")
+
+    def test_external_entity_is_rejected(self):
+        with self.assertRaises(etree.ParseError):
+            _items(
+                b"<item><g:title>&ext;</g:title></item>",
+                b'<!DOCTYPE rss [<!ENTITY ext SYSTEM "file:///etc/passwd">]>',
+            )
+
+    def test_billion_laughs_is_rejected(self):
+        decls = b'<!ENTITY e0 "laugh">' + b"".join(
+            b'<!ENTITY e%d "%s">' % (i, b"&e%d;" % (i - 1) * 10) for i in range(1, 10)
+        )
+        with self.assertRaises(etree.ParseError):
+            _items(b"<item><g:title>&e9;</g:title></item>", b"<!DOCTYPE rss [" + decls + b"]>")
+
+class ShippingTest(unittest.TestCase):
+    def _shipping(self, block: bytes) -> str:
+        (prod,) = _items(b"<item><g:id>1</g:id>" + block + b"</item>")
+        return prod["shipping"]
+
+    def test_nested_block_uses_positional_flat_form(self):
+        block = b"""<g:shipping>
+              <g:country>FR</g:country>
+              <g:service>Standard</g:service>
+              <g:price>4.95 EUR</g:price>
+            </g:shipping>"""
+        self.assertEqual(self._shipping(block), "FR::Standard:4.95 EUR")
+
+    def test_missing_sub_fields_keep_their_slot(self):
+        block = b"<g:shipping><g:price>4.95 EUR</g:price><g:country>FR</g:country></g:shipping>"
+        self.assertEqual(self._shipping(block), "FR:::4.95 EUR")
+
+    def test_flat_value_is_kept(self):
+        self.assertEqual(self._shipping(b"<g:shipping> FR:::4.95 EUR </g:shipping>"), "FR:::4.95 EUR")
+
+    def test_empty_and_absent_block(self):
+        self.assertEqual(self._shipping(b"<g:shipping/>"), "")
+        self.assertEqual(self._shipping(b""), "MISSING")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Règles de validation des produits."""
+import unittest
+
+import audit_flux_streamlit as afs
+
+def _product(**values) -> dict:
+    return {attr: "MISSING" for attr in afs._PRODUCT_ATTRS} | values
+
+class DuplicateIdTest(unittest.TestCase):
+    def test_every_occurrence_of_a_duplicate_is_flagged(self):
+        validated = afs.validate_products(
+            [_product(id="A"), _product(id="B"), _product(id="A"), _product(id="A")]
+        )
+        self.assertEqual(
+            [prod["duplicate_id"] for prod in validated],
+            ["Erreur", "OK", "Erreur", "Erreur"],
+        )
+
+    def test_unique_ids_are_ok(self):
+        validated = afs.validate_products(_product(id=pid) for pid in ("1", "2", "3"))
+        self.assertEqual({prod["duplicate_id"] for prod in validated}, {"OK"})
+
+class NullPriceTest(unittest.TestCase):
+    def _null_price(self, price: str) -> str:
+        (prod,) = afs.validate_products([_product(id="1", price=price)])
+        return prod["null_price"]
+
+    def test_zero_amounts_are_flagged(self):
+        for price in ("0 EUR", "0.00 EUR", "0,00 €", "0.0"):
+            with self.subTest(price=price):
+                self.assertEqual(self._null_price(price), "Erreur")
+
+    def test_sub_unit_and_regular_prices_are_not_null(self):
+        for price in ("0.5 EUR", "0.99 EUR", "12.90 EUR", "10 EUR"):
+            with self.subTest(price=price):
+                self.assertEqual(self._null_price(price), "OK")
+
+    def test_missing_or_unreadable_price_is_not_null(self):
+        for price in ("MISSING", "gratuit", "0x10"):
+            with self.subTest(price=price):
+                self.assertEqual(self._null_price(price), "OK")
+
+if __name__ == "__main__":
+    unittest.main()